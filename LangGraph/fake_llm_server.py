@@ -0,0 +1,111 @@
+# fake_llm_server.py
+# 本地假 LLM 接口（OpenAI / DeepSeek chat completions 格式），用于离线测试 llm_gateway
+#
+# 启动：
+#     python fake_llm_server.py --port 8001 --latency 0.5 --fail-first 1
+# 然后在 .env 中设置：
+#     LLM_BASE_URL=http://127.0.0.1:8001
+#     DEEPSEEK_API_KEY=fake
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """按请求返回固定格式的回复，可模拟延迟与 429 限流"""
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+
+        with server.lock:
+            server.requests += 1
+            server.bodies.append(request)
+            fail = server.requests <= server.fail_first
+            scripted = server.replies.pop(0) if not fail and server.replies else None
+
+        if fail:
+            self._send(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}})
+            return
+
+        time.sleep(server.latency)
+        messages = request.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        content = scripted if scripted is not None else server.reply or f"[fake] {last}"
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages)
+        self._send(200, {
+            "id": f"fake-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_tokens + len(content),
+            },
+        })
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # 不打印访问日志
+
+
+def start_fake_server(port: int = 0, latency: float = 0.0, fail_first: int = 0, reply: str = "",
+                      replies: Optional[List[str]] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动假接口
+
+    参数：
+    - port: 端口（0 表示自动分配）
+    - latency: 每次请求的模拟延迟（秒）
+    - fail_first: 前 N 次请求返回 429
+    - reply: 固定回复内容（为空时回显最后一条消息）
+    - replies: 依次返回的回复内容（可以为空字符串），用完后按 reply 规则回复
+
+    返回：
+    - (server, base_url)，用完调用 server.shutdown()；server.bodies 记录收到的请求体
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.latency = latency
+    server.fail_first = fail_first
+    server.reply = reply
+    server.replies = list(replies or [])
+    server.bodies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地假 LLM 接口")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--reply", default="")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.port, args.latency, args.fail_first, args.reply)
+    print(f"🚀 假 LLM 接口已启动: {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
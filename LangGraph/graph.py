@@ -2,10 +2,16 @@ from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite import SqliteSaver
 from state import GraphState
 from nodes import (
+    load_outline_context,
+    load_worldguide_context,
+    load_latest_outline,
     input_system_prompt,
     concat_prompt,
     generate_outline,
-    outline_human_intervention
+    outline_human_intervention,
+    concat_worldguide_prompt,
+    generate_worldguide,
+    worldguide_human_intervention
 )
 import os
 
@@ -26,34 +32,82 @@ def timed_node(name, func):
     return wrapper
 
 
+# 并行分支计时：耗时写入 state["branch_timings"]，由汇合节点汇总
+def timed_branch(name, func):
+    def wrapper(state):
+        start = time.time()
+        result = func(state)
+        elapsed = time.time() - start
+        print(f"[{name}] 耗时: {elapsed:.3f}s")
+        return {**result, "branch_timings": {name: elapsed}}
+    return wrapper
+
+
+# 汇合节点计时：先打印各并行分支耗时及关键路径，再执行节点本身
+def timed_join(name, func, branches):
+    timed = timed_node(name, func)
+    def wrapper(state):
+        timings = {b: state.get("branch_timings", {}).get(b) for b in branches}
+        if state.get("first_time") and all(t is not None for t in timings.values()):
+            critical = max(timings, key=timings.get)
+            print(f"[{name}] 并行分支: " + ", ".join(f"{b} {t:.3f}s" for b, t in timings.items())
+                  + f" | 关键路径: {critical}")
+        return timed(state)
+    return wrapper
+
+
 # 构建状态图
 def build_graph():
     # 1. 创建一个基于 GraphState 的状态图
     graph = StateGraph(GraphState)
 
     # 2. 注册所有节点
+    # 并行分支：大纲流程与设定集流程各自一组，避免共用节点触发另一流程的汇合
+    outline_branches = ["read_outlines", "read_worldguides"]
+    worldguide_branches = ["read_latest_outline", "read_past_worldguides"]
+    graph.add_node("read_outlines", timed_branch("read_outlines", load_outline_context))
+    graph.add_node("read_worldguides", timed_branch("read_worldguides", load_worldguide_context))
+    graph.add_node("read_latest_outline", timed_branch("read_latest_outline", load_latest_outline))
+    graph.add_node("read_past_worldguides", timed_branch("read_past_worldguides", load_worldguide_context))
+
     graph.add_node("input_system_prompt", timed_node("input_system_prompt", input_system_prompt))
-    graph.add_node("concat_prompt", timed_node("concat_prompt", concat_prompt))
+    graph.add_node("concat_prompt", timed_join("concat_prompt", concat_prompt, outline_branches))
     graph.add_node("generate_outline", timed_node("generate_outline", generate_outline))
     graph.add_node("outline_human_intervention", timed_node("outline_human_intervention", outline_human_intervention))
+    graph.add_node("concat_worldguide_prompt", timed_join("concat_worldguide_prompt", concat_worldguide_prompt, worldguide_branches))
+    graph.add_node("generate_worldguide", timed_node("generate_worldguide", generate_worldguide))
+    graph.add_node("worldguide_human_intervention", timed_node("worldguide_human_intervention", worldguide_human_intervention))
 
     # 3. 设置入口节点
     graph.set_entry_point("input_system_prompt")
 
-    # 4. 设置边：节点1 -> 节点2 -> 节点3
-    graph.add_edge("input_system_prompt", "concat_prompt")
+    # 4. 设置边：节点1 -> 并行读取大纲/设定集 -> 节点2 -> 节点3
+    for branch in outline_branches:
+        graph.add_edge("input_system_prompt", branch)
+    graph.add_edge(outline_branches, "concat_prompt") # 等待所有分支完成后汇合
     graph.add_edge("concat_prompt", "generate_outline")
 
     # 5. 大纲生成后进入节点4
     graph.add_edge("generate_outline", "outline_human_intervention")
     
-    # 6. 人工干预后条件边：quit->END，y->节点1，其他->节点2
+    # 6. 人工干预后条件边：quit->END，y->并行读取最新大纲/设定集，其他->节点2
     graph.add_conditional_edges(
         "outline_human_intervention",
-        lambda state: END if state["user_input"].lower() == "quit" else ("input_system_prompt" if state["user_input"].lower() == "y" else "concat_prompt")
+        lambda state: END if state["user_input"].lower() == "quit" else (worldguide_branches if state["user_input"].lower() == "y" else "concat_prompt")
+    )
+
+    # 7. 设定集：并行读取 -> 节点5 -> 节点6 -> 节点7
+    graph.add_edge(worldguide_branches, "concat_worldguide_prompt") # 等待所有分支完成后汇合
+    graph.add_edge("concat_worldguide_prompt", "generate_worldguide")
+    graph.add_edge("generate_worldguide", "worldguide_human_intervention")
+
+    # 8. 设定集人工干预后条件边：quit->END，y->节点1，其他->节点5
+    graph.add_conditional_edges(
+        "worldguide_human_intervention",
+        lambda state: END if state["user_input"].lower() == "quit" else ("input_system_prompt" if state["user_input"].lower() == "y" else "concat_worldguide_prompt")
     )
 
-    # 7. 返回 graph (不带 checkpointer，在 main.py 中使用上下文管理器)
+    # 9. 返回 graph (不带 checkpointer，在 main.py 中使用上下文管理器)
     return graph
 
 def get_checkpointer():
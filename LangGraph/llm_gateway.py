@@ -0,0 +1,267 @@
+# llm_gateway.py
+# 共享 LLM 客户端：连接池 + 并发上限 + 每分钟 token 限额 + 优先级调度 + 重试 + 调用记录
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+# 优先级：数值越小越先调度
+INTERACTIVE = 0   # 人工审阅流程中的请求（用户正在等待）
+BACKGROUND = 10   # 后台请求（推测生成等）
+
+# 可重试的错误：限流、超时、连接失败、服务端 5xx
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class LLMCancelled(Exception):
+    """调用在发出请求前被取消（推测任务被丢弃）"""
+
+
+@dataclass
+class CallRecord:
+    """单次 LLM 调用记录"""
+    priority: int
+    queued: float          # 排队等待时间（秒）
+    latency: float         # 请求耗时（秒，含重试）
+    input_tokens: int
+    output_tokens: int
+    attempts: int
+    ok: bool
+
+
+class _Scheduler:
+    """按优先级发放调用许可，同时限制并发数与每分钟 token 数"""
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: Optional[int]):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self._cond = threading.Condition()
+        self._waiting: List = []          # 等待队列（堆）：(priority, seq)
+        self._seq = itertools.count()
+        self._active = 0
+        self._window: deque = deque()     # 最近 60 秒的 [时间, token 数]（进行中的调用为预留值）
+
+    def _window_tokens(self, now: float) -> int:
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+        return sum(tokens for _, tokens in self._window)
+
+    def _wait_time(self, now: float, tokens: int) -> Optional[float]:
+        """返回 None 表示可以立即调度，否则返回建议等待秒数"""
+        if self._active >= self.max_concurrency:
+            return 1.0
+        if self.tokens_per_minute:
+            used = self._window_tokens(now)
+            # 窗口为空时总是放行，否则单次预估超过限额的调用永远无法调度
+            if used and used + tokens > self.tokens_per_minute:
+                return max(60 - (now - self._window[0][0]), 0.05)
+        return None
+
+    def acquire(self, priority: int, tokens: int = 0, cancel: Optional[threading.Event] = None) -> list:
+        """
+        等待调用许可，并在 token 窗口中预留 tokens（预估用量）
+
+        返回预留记录，调用结束后交给 release 按实际用量修正；
+        cancel 被设置时退出队列并抛出 LLMCancelled
+        """
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    raise LLMCancelled()
+                now = time.time()
+                wait = self._wait_time(now, tokens)
+                if self._waiting[0] == ticket and wait is None:
+                    heapq.heappop(self._waiting)
+                    self._active += 1
+                    reservation = [now, tokens]
+                    self._window.append(reservation)
+                    self._cond.notify_all()
+                    return reservation
+                if cancel is not None:
+                    wait = min(wait or 0.1, 0.1)  # 定期检查取消标记
+                self._cond.wait(timeout=wait)
+
+    def release(self, reservation: list, tokens: int) -> None:
+        """释放许可，把预留的 token 数修正为实际用量"""
+        with self._cond:
+            self._active -= 1
+            reservation[1] = tokens
+            self._cond.notify_all()
+
+
+class LLMGateway:
+    """
+    所有节点共用的 LLM 入口
+
+    - 复用同一个 httpx 连接池
+    - 超过并发上限或 token 限额时排队，interactive 请求优先于 background
+    - 可重试错误按指数退避重试
+    - 每次调用记录 token 用量与耗时
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str],
+        base_url: str,
+        temperature: float = 0.8,
+        max_tokens: Optional[int] = None,
+        output_token_estimate: Optional[int] = None,
+        max_concurrency: int = 2,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_base: float = 2.0,
+        timeout: float = 600.0,
+    ):
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=timeout,
+        )
+        self._llm = ChatOpenAI(
+            model=model,
+            api_key=api_key,
+            base_url=base_url,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            max_retries=0,  # 重试由网关统一处理
+            http_client=self._http_client,
+        )
+        self._scheduler = _Scheduler(max_concurrency, tokens_per_minute)
+        # 预留 token 时对输出的预估，默认按 max_tokens 上限预留
+        self.output_token_estimate = output_token_estimate if output_token_estimate is not None else (max_tokens or 0)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.records: List[CallRecord] = []
+        self._records_lock = threading.Lock()
+
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """预估一次调用的 token 数：输入按字符数估算（中文约 1 字 1 token）+ 输出预估"""
+        return sum(len(str(m.get("content", ""))) for m in messages) + self.output_token_estimate
+
+    def invoke(self, messages: List[Dict[str, str]], priority: int = INTERACTIVE,
+               cancel: Optional[threading.Event] = None):
+        """
+        调用 LLM，返回 AIMessage（与 ChatOpenAI.invoke 一致）
+
+        cancel: 取消标记。排队期间、拿到许可后、重试前都会检查，被设置时抛出 LLMCancelled；
+        已发出的请求无法中断
+        """
+        estimate = self._estimate_tokens(messages)
+        queued = latency = 0.0
+        attempts = 0
+        response = None
+        input_tokens = output_tokens = 0
+        try:
+            while True:
+                queued_at = time.time()
+                reservation = self._scheduler.acquire(priority, estimate, cancel)
+                started = time.time()
+                queued += started - queued_at
+                if cancel is not None and cancel.is_set():
+                    self._scheduler.release(reservation, 0)
+                    raise LLMCancelled()
+                attempts += 1
+                try:
+                    response = self._llm.invoke(messages)
+                except RETRYABLE_ERRORS as e:
+                    latency += time.time() - started
+                    # 被限流的请求未消耗 token；超时等错误无法确认用量，保留预估值
+                    self._scheduler.release(reservation, 0 if isinstance(e, openai.RateLimitError) else estimate)
+                    if attempts > self.max_retries:
+                        raise
+                    delay = self.backoff_base * 2 ** (attempts - 1)
+                    delay += random.uniform(0, delay)
+                    print(f"[llm] 第 {attempts} 次请求失败（{type(e).__name__}），{delay:.1f}s 后重试")
+                    time.sleep(delay)  # 退避期间不占用并发名额，重试时重新排队
+                    continue
+                except BaseException:
+                    latency += time.time() - started
+                    self._scheduler.release(reservation, estimate)
+                    raise
+                latency += time.time() - started
+                usage = getattr(response, "usage_metadata", None) or {}
+                input_tokens = usage.get("input_tokens", 0)
+                output_tokens = usage.get("output_tokens", 0)
+                self._scheduler.release(reservation, input_tokens + output_tokens)
+                return response
+        finally:
+            if attempts:
+                record = CallRecord(
+                    priority=priority,
+                    queued=queued,
+                    latency=latency,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    attempts=attempts,
+                    ok=response is not None,
+                )
+                with self._records_lock:
+                    self.records.append(record)
+                print(f"[llm] priority={priority} 排队 {record.queued:.1f}s 耗时 {record.latency:.1f}s "
+                      f"输入 {input_tokens} tokens 输出 {output_tokens} tokens 尝试 {attempts} 次")
+
+    def summary(self) -> Dict[str, float]:
+        """汇总所有调用的 token 用量与耗时"""
+        with self._records_lock:
+            records = list(self.records)
+        return {
+            "calls": len(records),
+            "failed": sum(1 for r in records if not r.ok),
+            "input_tokens": sum(r.input_tokens for r in records),
+            "output_tokens": sum(r.output_tokens for r in records),
+            "latency": sum(r.latency for r in records),
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """
+    获取进程内共享的网关（首次调用时按环境变量创建）
+
+    环境变量：
+    - DEEPSEEK_API_KEY: API Key
+    - LLM_BASE_URL: 接口地址，测试时可指向 fake_llm_server（默认 https://api.deepseek.com）
+    - LLM_MAX_CONCURRENCY: 最大并发请求数（默认 2）
+    - LLM_TOKENS_PER_MINUTE: 每分钟 token 上限（默认不限）
+    - LLM_OUTPUT_TOKEN_ESTIMATE: 限额预留时每次调用的输出 token 预估（默认 max_tokens）
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            tpm = os.getenv("LLM_TOKENS_PER_MINUTE")
+            output_estimate = os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE")
+            _gateway = LLMGateway(
+                model="deepseek-reasoner",   # DeepSeek 深度思考模型
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+                base_url=os.getenv("LLM_BASE_URL", "https://api.deepseek.com"),
+                temperature=0.8,                # 文本生成温度
+                max_tokens=64000,
+                output_token_estimate=int(output_estimate) if output_estimate else None,
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "2")),
+                tokens_per_minute=int(tpm) if tpm else None,
+            )
+        return _gateway
@@ -36,3 +36,7 @@ with get_checkpointer() as checkpointer:
             "chapter_progress": 1,
         }
         result = app.invoke(initial_state, thread_config)
+
+# 本次运行的 LLM 调用统计
+from llm_gateway import get_gateway
+print(f"LLM 调用统计: {get_gateway().summary()}")
@@ -1,32 +1,119 @@
 from state import GraphState
-from langchain_openai import ChatOpenAI
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sripts.tool import read_all_texts_in_dir
+import speculative
+from llm_gateway import get_gateway, INTERACTIVE, BACKGROUND
 # =========================
 # 1. 加载 .env 中的环境变量
 # =========================
 load_dotenv()
 
 # =========================
-# 2. 初始化 DeepSeek LLM
+# 2. 初始化 DeepSeek LLM（共享网关：连接池、并发/限流、重试、调用记录）
 # =========================
-llm = ChatOpenAI(
-    model="deepseek-reasoner",   # DeepSeek 深度思考模型
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com",
-    temperature=0.8,                # 文本生成温度
-    max_tokens=64000
-)
+llm = get_gateway()
 
 # =========================
 # 3. 初始化参数
 # =========================
 outline_length = 10 # 大纲长度，每次生成10章内容的大纲
 chapter_length = 3000 # 章节长度，每次生成3000字的内容
+# 推测模式：人工审阅时在后台提前生成下一步产物（.env 中设置 SPECULATIVE_MODE=1 开启）
+speculative_mode = os.getenv("SPECULATIVE_MODE", "0") == "1"
+CONFIRM_INPUT = "y" # 大纲确认指令，作为设定集首轮消息的最后一条 user 内容（推测时与此一致）
+outline_min_length = int(outline_length * chapter_length * 0.3) # 大纲最少字数
+max_continuations = 3 # 字数不足时最多续写次数
+
+
+# =========================
+# 按字数生成：不足时续写，而不是整篇重写
+# =========================
+CONTINUE_PROMPT = "字数不足，请紧接上文最后一个字继续写，不要重复已写内容，不要任何说明。"
+
+def count_chars(text: str) -> int:
+    """统计字数（不含空白字符）"""
+    return len("".join(text.split()))
+
+
+def generate_to_length(messages: List[Dict[str, str]], min_length: int, max_length: Optional[int] = None,
+                       priority: int = INTERACTIVE) -> Tuple[str, int]:
+    """
+    调用 LLM 生成文本，字数不足 min_length 时把已有文本作为前文续写，达标即停止
+
+    返回：
+    - (完整文本, 续写调用次数)
+    """
+    text = llm.invoke(messages, priority=priority).content
+    continuations = 0
+    while count_chars(text) < min_length and continuations < max_continuations:
+        remaining = min_length - count_chars(text)
+        hint = f"还需约{remaining}字" + (f"，总字数不要超过{max_length}字" if max_length else "") + "。"
+        more = llm.invoke(messages + [
+            {"role": "assistant", "content": text},
+            {"role": "user", "content": CONTINUE_PROMPT + hint}
+        ], priority=priority).content
+        continuations += 1
+        if not more.strip():
+            break
+        text += more
+
+    length = count_chars(text)
+    if length < min_length:
+        print(f"⚠️ 续写 {continuations} 次后字数仍不足：{length}/{min_length}")
+    elif max_length and length > max_length:
+        print(f"⚠️ 字数超出上限：{length}/{max_length}")
+    return text, continuations
+
+
+# =========================
+# 上下文读取（并行分支节点）
+# =========================
+# 以下节点只返回自己负责的字段，由 graph 并行调度后合并进 GraphState
+def read_outlines() -> str:
+    """读取 data/outline 下所有过往大纲"""
+    outline_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outline")
+    return "\n\n".join(read_all_texts_in_dir(outline_dir))
+
+
+def read_worldguides() -> str:
+    """读取全部设定集（目录不存在时返回空字符串）"""
+    worldguide_dir = os.path.join(os.path.dirname(__file__), "..", "data", "WorldGuide")
+    if os.path.isdir(worldguide_dir): # 检查文件夹是否存在
+        return "\n\n".join(read_all_texts_in_dir(worldguide_dir)) # 将所有设定集内容用双换行符连接
+    return ""
+
+
+def read_latest_outline(chapter_progress: int) -> str:
+    """读取最新大纲（当前批次：chapter_progress-outline_length 到 chapter_progress-1）"""
+    outline_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outline")
+    latest_outline_file = os.path.join(
+        outline_dir,
+        f"outline_{chapter_progress-outline_length}-{chapter_progress-1}.txt"
+    ) # 最新大纲文件路径
+    if os.path.exists(latest_outline_file): # 检查文件是否存在
+        with open(latest_outline_file, "r", encoding="utf-8") as f:
+            return f.read()
+    return ""
+
+
+def load_outline_context(state: GraphState) -> dict:
+    """并行分支：读取过往大纲"""
+    return {"outline_context": read_outlines()}
+
+
+def load_worldguide_context(state: GraphState) -> dict:
+    """并行分支：读取过往设定集"""
+    return {"worldguide_context": read_worldguides()}
+
+
+def load_latest_outline(state: GraphState) -> dict:
+    """并行分支：读取最新大纲"""
+    return {"latest_outline": read_latest_outline(state["chapter_progress"])}
 
 
 # =========================
@@ -61,24 +148,12 @@ OUTLINE_SYSTEM_PROMPT = f"""你是一位专业的网文小说作家，擅长撰
 def concat_prompt(state: GraphState) -> GraphState:
     """拼接提示词，使用 DeepSeek 消息格式"""
     if state["first_time"] is True:
-        # 首次调用：读取 data/outline 下所有文件内容
-        outline_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outline")
-        outline_contents = read_all_texts_in_dir(outline_dir)
-        outline_text = "\n\n".join(outline_contents)
-        
-        # 读取全部设定集
-        worldguide_dir = os.path.join(os.path.dirname(__file__), "..", "data", "WorldGuide")
-        if os.path.isdir(worldguide_dir):
-            worldguide_contents = read_all_texts_in_dir(worldguide_dir)
-            worldguide_text = "\n\n".join(worldguide_contents)
-        else:
-            worldguide_text = ""
-        
+        # 首次调用：过往大纲与设定集已由并行分支读入 state
         # 结合大纲、设定集和用户输入生成首次提示词（DeepSeek 格式）
         state["prompts_message"] = [
             {"role": "system", "content": OUTLINE_SYSTEM_PROMPT},
-            {"role": "user", "content": f"过去章节的大纲：\n{outline_text}"},
-            {"role": "user", "content": f"全部设定集：\n{worldguide_text}"},
+            {"role": "user", "content": f"过去章节的大纲：\n{state['outline_context']}"},
+            {"role": "user", "content": f"全部设定集：\n{state['worldguide_context']}"},
             {"role": "user", "content": state["user_input"]}
         ]
     else:
@@ -91,9 +166,8 @@ def concat_prompt(state: GraphState) -> GraphState:
 # 节点 3：大纲生成（LLM）
 # =========================
 def generate_outline(state: GraphState) -> GraphState:
-    """调用 LLM 生成大纲"""
-    response = llm.invoke(state["prompts_message"])
-    state["response"] = response.content
+    """调用 LLM 生成大纲（字数不足时续写）"""
+    state["response"], state["continuation_calls"] = generate_to_length(state["prompts_message"], outline_min_length)
     
     state["first_time"] = False
     
@@ -103,7 +177,16 @@ def generate_outline(state: GraphState) -> GraphState:
      "w", encoding="utf-8") as f:
         f.write(state["response"])
 
-    print("大纲已生成")
+    print(f"大纲已生成（{count_chars(state['response'])}字，续写 {state['continuation_calls']} 次）")
+
+    # 推测模式：用户审阅大纲期间，假设用户会确认，提前生成对应的设定集
+    if speculative_mode:
+        next_progress = state["chapter_progress"] + outline_length
+        speculative.submit(
+            _worldguide_key(next_progress),
+            build_worldguide_messages(read_latest_outline(next_progress), read_worldguides(), CONFIRM_INPUT),
+            lambda messages, cancel: llm.invoke(messages, priority=BACKGROUND, cancel=cancel).content
+        )
     return state
 
 
@@ -115,9 +198,12 @@ def outline_human_intervention(state: GraphState) -> GraphState:
     state["user_input"] = input("请输入指令(输入'y'重新生成, 'quit'退出, 或输入其他文本作为反馈): ").strip()
     
     if state["user_input"].lower() == "y":
+        state["user_input"] = CONFIRM_INPUT # 统一为小写，设定集消息与推测时一致
         state["first_time"] = True
         state["chapter_progress"] += outline_length # 增加章节进度
     else:
+        # 未确认：丢弃后台推测的设定集
+        speculative.discard(_worldguide_key(state["chapter_progress"] + outline_length))
         # 将response作为ai回复，用户输入作为新的user_input追加到prompts_message
         state["prompts_message"].append({"role": "assistant", "content": state["response"]})
     
@@ -140,38 +226,29 @@ WORLDGUIDE_SYSTEM_PROMPT = """你是一位专业的网文小说作家，擅长
 请直接输出设定集内容，不要包含任何额外的说明。"""
 
 
+def _worldguide_key(chapter_progress: int) -> str:
+    """设定集推测任务的标识"""
+    return f"worldguide:{chapter_progress}"
+
+
+def build_worldguide_messages(latest_outline: str, past_worldguide: str, user_input: str) -> List[Dict[str, str]]:
+    """构建首次生成设定集的消息列表（节点 5 与推测模式共用）"""
+    # system放指令，user放动态内容
+    return [
+        {"role": "system", "content": WORLDGUIDE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"【过往设定集】\n{past_worldguide}"},
+        {"role": "user", "content": f"【最新大纲】\n{latest_outline}"},
+        {"role": "user", "content": user_input}
+    ]
+
+
 def concat_worldguide_prompt(state: GraphState) -> GraphState:
     """拼接设定集生成提示词，使用 DeepSeek 消息格式"""
-    
-    # 1. 读取最新大纲（当前批次：chapter_progress 到 chapter_progress+outline_length-1）
-    outline_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outline")
-    latest_outline_file = os.path.join(
-        outline_dir,
-        f"outline_{state['chapter_progress']-outline_length}-{state['chapter_progress']-1}.txt"
-    ) # 最新大纲文件路径
-    if os.path.exists(latest_outline_file):
-        with open(latest_outline_file, "r", encoding="utf-8") as f: # 检查文件是否存在
-            latest_outline = f.read() # 读取最新大纲文件内容
-    else:
-        latest_outline = ""
-    
-    # 2. 读取过往设定集
-    worldguide_dir = os.path.join(os.path.dirname(__file__), "..", "data", "WorldGuide")
-    if os.path.isdir(worldguide_dir): # 检查文件夹是否存在
-        worldguide_contents = read_all_texts_in_dir(worldguide_dir) # 读取所有文本文件内容
-        past_worldguide = "\n\n".join(worldguide_contents) # 将所有设定集内容用双换行符连接
-    else:
-        past_worldguide = ""
-    
-    # 3. 构建消息列表（system放指令，user放动态内容）
     if state["first_time"] is True:
         # 首次调用：构建完整消息列表
-        state["prompts_message"] = [
-            {"role": "system", "content": WORLDGUIDE_SYSTEM_PROMPT},
-            {"role": "user", "content": f"【过往设定集】\n{past_worldguide}"},
-            {"role": "user", "content": f"【最新大纲】\n{latest_outline}"},
-            {"role": "user", "content": state["user_input"]}
-        ]
+        state["prompts_message"] = build_worldguide_messages(
+            state["latest_outline"], state["worldguide_context"], state["user_input"]
+        )
     else:
         # 非首次：将 user_input 追加到 messages 列表
         state["prompts_message"].append({"role": "user", "content": state["user_input"]})
@@ -184,8 +261,13 @@ def concat_worldguide_prompt(state: GraphState) -> GraphState:
 # =========================
 def generate_worldguide(state: GraphState) -> GraphState:
     """调用 LLM 生成设定集"""
-    response = llm.invoke(state["prompts_message"])
-    state["response"] = response.content
+    # 推测模式：输入与推测时一致则直接采用后台结果
+    response = None
+    if speculative_mode and state["first_time"] is True:
+        response = speculative.take(_worldguide_key(state["chapter_progress"]), state["prompts_message"])
+    if response is None:
+        response = llm.invoke(state["prompts_message"]).content
+    state["response"] = response
     
     state["first_time"] = False
     
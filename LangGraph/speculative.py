@@ -0,0 +1,103 @@
+# speculative.py
+# 推测式后台生成：用户审阅时，提前在后台生成"最可能的下一步产物"
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from llm_gateway import LLMCancelled
+
+_lock = threading.Lock()
+
+# 推测任务登记表：key -> (提交时的消息列表, Future, 取消标记)
+# 注意：Future 无法序列化，不能放进 GraphState（会被 checkpointer 持久化）
+_tasks: Dict[str, Tuple[List[Dict[str, str]], Future, threading.Event]] = {}
+
+
+def submit(key: str, messages: List[Dict[str, str]],
+           generate: Callable[[List[Dict[str, str]], threading.Event], str]) -> None:
+    """
+    提交一个推测任务，在后台调用 generate(messages)
+
+    参数：
+    - key: 产物标识，例如 "worldguide:11"
+    - messages: 推测时使用的消息列表（确认后会与真实消息列表比对）
+    - generate: 实际生成函数 generate(messages, cancel)，返回生成文本；
+      需在发出请求前检查 cancel（如 LLMGateway.invoke 的 cancel 参数），被丢弃时尽早退出
+    """
+    snapshot = [dict(m) for m in messages]
+    future: Future = Future()
+    cancel = threading.Event()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(generate(snapshot, cancel))
+        except Exception as e:
+            future.set_exception(e)
+
+    with _lock:
+        _discard_locked(key)
+        _tasks[key] = (snapshot, future, cancel)
+    # 守护线程：用户输入 quit 时不必等待后台请求结束
+    threading.Thread(target=run, name=f"speculative-{key}", daemon=True).start()
+    print(f"[speculative] 已在后台开始生成 {key}")
+
+
+def take(key: str, messages: List[Dict[str, str]]) -> Optional[str]:
+    """
+    取出推测结果
+
+    只有当推测时的消息列表与当前真实消息列表完全一致时才采用结果，
+    保证输出与不推测时等价；否则丢弃并返回 None，由调用方正常生成。
+
+    后台任务还在排队（尚未发出请求）时直接取消并返回 None，由调用方以 INTERACTIVE
+    优先级重新生成，避免用户等待一个低优先级的排队请求；已发出的请求则等待其完成。
+    """
+    with _lock:
+        entry = _tasks.pop(key, None)
+    if entry is None:
+        return None
+
+    snapshot, future, cancel = entry
+    if snapshot != messages:
+        cancel.set()
+        print(f"[speculative] {key} 的输入已变化，丢弃推测结果")
+        return None
+
+    if not future.done():
+        # 排队中的请求会在拿到许可前后检查取消标记并抛出 LLMCancelled；已发出的请求不受影响
+        cancel.set()
+        print(f"[speculative] 等待后台 {key} 生成完成...")
+    try:
+        result = future.result()
+    except LLMCancelled:
+        print(f"[speculative] 后台 {key} 尚未开始请求，改为前台生成")
+        return None
+    except Exception as e:
+        print(f"[speculative] 后台生成 {key} 失败，改为正常生成: {e}")
+        return None
+
+    print(f"[speculative] 采用后台生成的 {key}")
+    return result
+
+
+def discard(key: str) -> None:
+    """丢弃推测任务（用户给出反馈时调用）"""
+    with _lock:
+        _discard_locked(key)
+
+
+def _discard_locked(key: str) -> None:
+    entry = _tasks.pop(key, None)
+    if entry is None:
+        return
+    _, future, cancel = entry
+    # 设置取消标记：还在排队或尚未发出请求的任务会放弃请求、让出并发名额；
+    # 已发出的请求无法中断，结果将被忽略
+    cancel.set()
+    if future.done():
+        print(f"[speculative] 丢弃 {key} 的推测结果")
+    else:
+        print(f"[speculative] 已取消 {key}")
@@ -1,4 +1,10 @@
-from typing import TypedDict, Optional, List, Dict
+from typing import TypedDict, Optional, List, Dict, Annotated
+
+
+def merge_timings(left: Optional[Dict[str, float]], right: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """并行分支耗时合并（多个分支在同一步写入时按分支名合并）"""
+    return {**(left or {}), **(right or {})}
+
 
 class GraphState(TypedDict):
     """
@@ -9,4 +15,9 @@ class GraphState(TypedDict):
     first_time: bool           # 是否第一次调用
     prompts_message: Optional[List[Dict[str, str]]]    # 消息列表
     response: Optional[str]        # LLM 的响应
+    continuation_calls: Optional[int]  # 最近一次生成的续写调用次数
     chapter_progress: Optional[int] # 章节进度
+    outline_context: Optional[str]     # 过往大纲（并行分支读取）
+    worldguide_context: Optional[str]  # 过往设定集（并行分支读取）
+    latest_outline: Optional[str]      # 最新大纲（并行分支读取）
+    branch_timings: Annotated[Dict[str, float], merge_timings]  # 并行分支耗时
@@ -6,11 +6,14 @@ from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct
 import charset_normalizer
+from sripts.dedup import Deduplicator, DEDUP_THRESHOLD
+from sripts.docstore import DocStore
 
 # 配置
 DATA_DIR = "data/references"
 DB_DIR = "db"
 COLLECTION_NAME = "documents"
+DOCSTORE_DIR = os.path.join(DB_DIR, "docstore")  # 片段原文存储（payload 不再存原文）
 
 def read_text_file(file_path):
     """自动检测编码并返回文本内容"""
@@ -54,7 +57,15 @@ def main():
         print(f"❌ Collection '{COLLECTION_NAME}' not found. Did you run init_db.py?")
         return
 
+    # 载入已入库片段的签名（入库时已存入 docstore），新片段与库中内容重复时同样丢弃
+    # 旧版本入库、没有签名的片段不参与去重，重新运行 init_db.py 即可补齐
+    dedup = Deduplicator(DEDUP_THRESHOLD)  # 阈值统一在 sripts/dedup.py 配置
+    docstore = DocStore(DOCSTORE_DIR)
+    for signature in docstore.iter_signatures():
+        dedup.seed(signature)
+
     points = []
+    chunks = []  # (point_id, 原文, MinHash 签名)，写入 docstore
     # 获取当前最大 ID（用于新 point 的 ID）
     # Qdrant 不提供直接获取 max_id 的方法，我们用一个简单策略：从现有点数估算
     # 更严谨的做法是维护一个外部计数器，但为简化，我们用时间戳或大基数 ID
@@ -79,22 +90,31 @@ def main():
         for para in paragraphs:
             if not para:
                 continue
+            # 近重复片段直接丢弃，不做向量化
+            signature = dedup.check(para)
+            if signature is None:
+                continue
             emb = model.encode(para).tolist()
             points.append(
                 PointStruct(
                     id=point_id,
                     vector=emb,
                     payload={
-                        "text": para,
                         "source_file": os.path.basename(file_path)
                     }
                 )
             )
+            chunks.append((point_id, para, signature))
             point_id += 1
         added_files.append(os.path.basename(file_path))
 
+    print(f"🧹 {dedup.report()}")
+
     if points:
         print(f"Inserting {len(points)} new vectors into Qdrant...")
+        # 先写原文再写向量，避免检索到没有原文的点
+        raw_bytes, stored_bytes = docstore.put_many(chunks)
+        print(f"📦 原文 {raw_bytes / 1024:.1f} KB，压缩后 {stored_bytes / 1024:.1f} KB")
         client.upsert(collection_name=COLLECTION_NAME, points=points)
         print(f"✅ Successfully added files: {', '.join(added_files)}")
     else:
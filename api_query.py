@@ -34,19 +34,23 @@
 """
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
+from sripts.dedup import collapse_hits, DEDUP_THRESHOLD
+from sripts.docstore import DocStore, truncate_snippet
 
 # ----------------------------
 # 配置常量
 # ----------------------------
 DB_DIR = "db"
 COLLECTION_NAME = "documents"
+DOCSTORE_DIR = os.path.join(DB_DIR, "docstore")  # 片段原文存储
 DEFAULT_TOP_K = 3
 MAX_TOP_K = 10  # 防止用户请求过大结果集
+OVERFETCH = 3   # 多取 top_k * OVERFETCH 条，折叠近重复后再截取 top_k
 
 # ----------------------------
 # 初始化模型与数据库客户端（启动时加载一次）
@@ -57,6 +61,7 @@ if not os.path.exists(DB_DIR) or not os.listdir(DB_DIR):
 print("Loading embedding model...")
 EMBEDDING_MODEL = SentenceTransformer('./models/bge-small-zh-v1.5')
 QDRANT_CLIENT = QdrantClient(path=DB_DIR)
+DOCSTORE = DocStore(DOCSTORE_DIR)
 
 if not QDRANT_CLIENT.collection_exists(COLLECTION_NAME):
     raise RuntimeError(f"❌ 集合 '{COLLECTION_NAME}' 不存在，请先运行 init_db.py")
@@ -76,6 +81,7 @@ app = FastAPI(
 class QueryRequest(BaseModel):
     text: str                      # 用户查询文本
     top_k: Optional[int] = None   # 返回结果数量（可选，默认3）
+    snippet_length: Optional[int] = Field(None, ge=1)  # 原文截取长度（可选，至少 1，默认返回完整片段）
 
 class SearchResultItem(BaseModel):
     score: float                  # 相似度分数（余弦相似度，范围 [-1, 1]）
@@ -90,14 +96,16 @@ class QueryResponse(BaseModel):
 # ----------------------------
 # API 路由
 # ----------------------------
+# 同步函数：向量化与检索都是阻塞调用，由 FastAPI 放到线程池执行，不阻塞事件循环
 @app.post("/query", response_model=QueryResponse, summary="执行语义检索")
-async def query_endpoint(request: QueryRequest):
+def query_endpoint(request: QueryRequest):
     """
     根据用户输入的自然语言问题，在本地文档库中检索最相关的文本片段。
 
     **参数说明**:
     - `text`: 必填，要查询的问题（支持中文）
     - `top_k`: 可选，返回结果数量（默认 3，最大 10）
+    - `snippet_length`: 可选，每条结果只返回前 N 个字符
 
     **返回示例**:
     ```json
@@ -133,16 +141,25 @@ async def query_endpoint(request: QueryRequest):
         search_result = QDRANT_CLIENT.query_points(
             collection_name=COLLECTION_NAME,
             query=query_vector,
-            limit=top_k
+            limit=top_k * OVERFETCH,
+            with_payload=["source_file", "text"]  # text 仅旧数据存在
         )
 
-        # 3. 构造响应结果
+        # 3. 用入库时存储的签名折叠近重复片段，避免重复内容占用结果名额（只读签名，不解压原文）
+        signatures = DOCSTORE.get_signatures(hit.id for hit in search_result.points)
+        hits = collapse_hits(search_result.points, signatures, top_k, DEDUP_THRESHOLD)
+
+        # 4. 只读取最终返回的 top_k 条原文（本地 mmap 读取）
+        texts = DOCSTORE.get_many(hit.id for hit in hits)
+
+        # 5. 构造响应结果
         results = []
-        for hit in search_result.points:
+        for hit in hits:
+            text = texts.get(hit.id) or hit.payload.get("text", "")
             results.append(
                 SearchResultItem(
                     score=round(hit.score, 4),
-                    text=hit.payload.get("text", ""),
+                    text=truncate_snippet(text, request.snippet_length),
                     source_file=hit.payload.get("source_file", "unknown")
                 )
             )
@@ -5,11 +5,14 @@ from pathlib import Path
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance, PointStruct
+from sripts.dedup import Deduplicator, DEDUP_THRESHOLD
+from sripts.docstore import DocStore
 
 # 配置路径
 DATA_DIR = "data/references"
 DB_DIR = "db"
 COLLECTION_NAME = "documents"
+DOCSTORE_DIR = os.path.join(DB_DIR, "docstore")  # 片段原文存储（payload 不再存原文）
 
 # 确保目录存在
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -44,6 +47,9 @@ else:
         vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE)
     )
 
+# 原文存储与集合一起清空重建（即使下面因没有数据提前退出，也不会留下旧原文）
+docstore = DocStore.reset(DOCSTORE_DIR)
+
 # 读取所有 txt 文件
 txt_files = glob.glob(os.path.join(DATA_DIR, "*.txt"))
 if not txt_files:
@@ -51,7 +57,9 @@ if not txt_files:
     exit()
 
 points = []
+chunks = []  # (point_id, 原文, MinHash 签名)，写入 docstore
 point_id = 1
+dedup = Deduplicator(DEDUP_THRESHOLD)  # 阈值统一在 sripts/dedup.py 配置
 
 for file_path in txt_files:
     print(f"Processing {file_path}...")
@@ -65,19 +73,29 @@ for file_path in txt_files:
         paragraphs = [content]  # 如果没分段，整篇作为一块
     
     for para in paragraphs:
+        # 近重复片段（作者的话、重复章节等）直接丢弃，不做向量化
+        signature = dedup.check(para)
+        if signature is None:
+            continue
         emb = model.encode(para).tolist()
         points.append(
             PointStruct(
                 id=point_id,
                 vector=emb,
                 payload={
-                    "text": para,
                     "source_file": os.path.basename(file_path)
                 }
             )
         )
+        chunks.append((point_id, para, signature))
         point_id += 1
 
+print(f"🧹 {dedup.report()}")
+
+# 原文写入 docstore
+raw_bytes, stored_bytes = docstore.put_many(chunks)
+print(f"📦 原文 {raw_bytes / 1024:.1f} KB，压缩后 {stored_bytes / 1024:.1f} KB")
+
 # 批量插入
 print(f"Inserting {len(points)} vectors into Qdrant...")
 client.upsert(collection_name=COLLECTION_NAME, points=points)
@@ -3,10 +3,14 @@ import os
 import sys
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
+from sripts.dedup import collapse_hits, DEDUP_THRESHOLD
+from sripts.docstore import DocStore
 
 DB_DIR = "db"
 COLLECTION_NAME = "documents"
+DOCSTORE_DIR = os.path.join(DB_DIR, "docstore")  # 片段原文存储
 TOP_K = 10
+OVERFETCH = 3   # 多取 TOP_K * OVERFETCH 条，折叠近重复后再截取 TOP_K
 
 def main():
     if not os.path.exists(DB_DIR) or not os.listdir(DB_DIR):
@@ -30,8 +34,13 @@ def main():
         results = client.query_points(
             collection_name=COLLECTION_NAME,
             query=query_vector,      # 注意：参数名是 query，不是 query_vector
-            limit=TOP_K
+            limit=TOP_K * OVERFETCH,
+            with_payload=["source_file", "text"]  # text 仅旧数据存在
         ).points  # 返回的是 SearchResult 对象，需取 .points
+        docstore = DocStore(DOCSTORE_DIR)
+        signatures = docstore.get_signatures(hit.id for hit in results)
+        results = collapse_hits(results, signatures, TOP_K, DEDUP_THRESHOLD)  # 用存储的签名折叠近重复片段
+        texts = docstore.get_many(hit.id for hit in results)  # 只读取最终结果的原文
     except Exception as e:
         print(f"❌ Search failed: {e}")
         return
@@ -43,7 +52,7 @@ def main():
     print(f"\n🔍 找到 {len(results)} 个相关片段（Top-{TOP_K}）:\n")
     for i, hit in enumerate(results, 1):
         score = hit.score
-        text = hit.payload.get("text", "")
+        text = texts.get(hit.id) or hit.payload.get("text", "")
         source = hit.payload.get("source_file", "unknown")
         print(f"{i}. 相似度: {score:.4f} | 来源: {source}")
         print(f"   内容: {text}\n")
@@ -0,0 +1,160 @@
+# dedup.py
+# 近重复片段去重（MinHash）：入库前丢弃重复片段，检索后折叠重复结果
+
+import os
+import random
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Jaccard 相似度 >= 阈值视为近重复（入库去重与检索折叠共用，可用环境变量 DEDUP_THRESHOLD 覆盖）
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+SHINGLE_SIZE = 3           # 按 3 字滑窗切分（适合中文）
+NUM_PERM = 64              # MinHash 签名长度（每个值 32 位，入库时随片段一起存储）
+
+# 数字统一替换为占位符：「第一章/第二章」「两更/三更」这类只差数字的模板文字视为相同
+_NUMERALS = re.compile(r"[0-9０-９零〇一二三四五六七八九十百千万两]+")
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)  # 固定种子，保证每次运行签名一致
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+Signature = Tuple[int, ...]
+
+
+def normalize(text: str) -> str:
+    """去掉空白字符，并把数字替换为占位符"""
+    return _NUMERALS.sub("#", "".join(text.split()))
+
+
+def shingles(text: str, shingle_size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    切分滑窗片段（先做 normalize）
+
+    参数：
+    - text: 文本内容
+    - shingle_size: 滑窗长度
+
+    返回：
+    - 滑窗片段集合；短于滑窗的文本整体作为一个片段
+    """
+    normalized = normalize(text)
+    if len(normalized) <= shingle_size:
+        return {normalized}
+    return {normalized[i:i + shingle_size] for i in range(len(normalized) - shingle_size + 1)}
+
+
+def minhash(text: str) -> Signature:
+    """
+    计算文本的 MinHash 签名
+
+    两段文本签名中相同位置取值相等的比例，是其滑窗集合 Jaccard 相似度的无偏估计，
+    与文本长短无关（SimHash 的汉明距离在短文本上波动很大）。
+    计算较慢（纯 Python），只在入库时计算一次，检索时使用存储的签名
+    """
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """由签名估计 Jaccard 相似度"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _band_rows(threshold: float) -> int:
+    """
+    选择 LSH 每段行数：分段数 b = NUM_PERM / r 时，候选概率在 (1/b)^(1/r) 附近陡增，
+    取比阈值低一截的最大 r，保证达到阈值的重复片段几乎都会成为候选
+    """
+    for rows in (8, 4, 2):
+        if (rows / NUM_PERM) ** (1 / rows) <= threshold - 0.1:
+            return rows
+    return 1
+
+
+class MinHashIndex:
+    """
+    签名索引（LSH）：签名切成若干段，任意一段完全相同的签名才作为候选，
+    再用估计的 Jaccard 相似度确认，避免与全部已入库片段逐一比较
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.rows = _band_rows(threshold)
+        self._buckets: List[Dict[Signature, List[Signature]]] = [{} for _ in range(NUM_PERM // self.rows)]
+
+    def _keys(self, signature: Signature):
+        for i in range(len(self._buckets)):
+            yield i, signature[i * self.rows:(i + 1) * self.rows]
+
+    def find(self, signature: Signature) -> Optional[Signature]:
+        """返回索引中与之近重复的签名，没有则返回 None"""
+        for i, key in self._keys(signature):
+            for candidate in self._buckets[i].get(key, ()):
+                if similarity(candidate, signature) >= self.threshold:
+                    return candidate
+        return None
+
+    def add(self, signature: Signature) -> None:
+        """加入签名"""
+        for i, key in self._keys(signature):
+            self._buckets[i].setdefault(key, []).append(signature)
+
+
+class Deduplicator:
+    """入库去重：记录已保留片段的签名，并统计丢弃的片段数和字节数"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.index = MinHashIndex(threshold)
+        self.dropped = 0
+        self.bytes_saved = 0
+
+    def seed(self, signature: Signature) -> None:
+        """加入已入库片段的签名（add_doc 追加时使用）"""
+        self.index.add(signature)
+
+    def check(self, text: str) -> Optional[Signature]:
+        """
+        判断片段是否需要保留
+
+        返回：
+        - 需要保留时返回其签名（并加入索引），入库时随片段存储；近重复时返回 None
+        """
+        signature = minhash(text)
+        if self.index.find(signature) is not None:
+            self.dropped += 1
+            self.bytes_saved += len(text.encode("utf-8"))
+            return None
+        self.index.add(signature)
+        return signature
+
+    def report(self) -> str:
+        """去重统计"""
+        return f"去重丢弃 {self.dropped} 个近重复片段，节省 {self.bytes_saved / 1024:.1f} KB"
+
+
+def collapse_hits(hits: List[Any], signatures: Dict[Any, Signature], limit: int,
+                  threshold: float = DEDUP_THRESHOLD) -> List[Any]:
+    """
+    折叠检索结果中的近重复片段（hits 需按分数从高到低排列）
+
+    参数：
+    - hits: Qdrant 返回的 points
+    - signatures: {point ID: 入库时存储的签名}，没有签名的结果（旧数据）直接保留
+    - limit: 最多返回的结果数
+    - threshold: 近重复阈值
+
+    返回：
+    - 去重后的结果列表
+    """
+    kept: List[Any] = []
+    index = MinHashIndex(threshold)
+    for hit in hits:
+        signature = signatures.get(hit.id)
+        if signature is not None:
+            if index.find(signature) is not None:
+                continue
+            index.add(signature)
+        kept.append(hit)
+        if len(kept) >= limit:
+            break
+    return kept
@@ -0,0 +1,216 @@
+# docstore.py
+# 片段原文存储：按 chunk ID（即 Qdrant point ID）存取压缩文本，Qdrant payload 只保留少量元数据
+#
+# 目录结构：
+# - chunks.bin: 逐条 zlib 压缩的原文（首字节标记是否压缩）
+# - index.bin:  按 ID 升序排列的定长索引记录 (id, offset, length)
+# - signatures.bin: 与 index.bin 逐条对齐的 MinHash 签名（入库时计算一次，检索折叠与 add_doc 去重直接使用）
+
+import mmap
+import os
+import shutil
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sripts.dedup import NUM_PERM
+
+_RECORD = struct.Struct("<QQI")   # chunk ID, 数据偏移, 数据长度
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")  # MinHash 签名，全 0 表示没有签名
+_NO_SIGNATURE = bytes(_SIGNATURE.size)
+_COMPRESSED = b"z"
+_RAW = b"r"
+
+
+class DocStore:
+    """
+    只追加的片段原文存储
+
+    写入：put_many 追加原文并重建索引（索引只有定长记录，重写代价很小）
+    读取：get_many 通过 mmap 二分查找索引，按需解压，不把全部原文载入内存
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.data_path = os.path.join(path, "chunks.bin")
+        self.index_path = os.path.join(path, "index.bin")
+        self.signatures_path = os.path.join(path, "signatures.bin")
+        for file_path in (self.data_path, self.index_path, self.signatures_path):
+            if not os.path.exists(file_path):
+                open(file_path, "wb").close()
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[mmap.mmap] = None
+        self._signatures: Optional[mmap.mmap] = None
+        self._mapped_sizes: Tuple[int, int, int] = (-1, -1, -1)
+
+    @staticmethod
+    def reset(path: str) -> "DocStore":
+        """清空并重新创建存储（init_db 重建集合时使用）"""
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        return DocStore(path)
+
+    # ----------------------------
+    # 写入
+    # ----------------------------
+    def put_many(self, items: Iterable[Tuple]) -> Tuple[int, int]:
+        """
+        批量写入片段原文
+
+        参数：
+        - items: (chunk ID, 原文) 或 (chunk ID, 原文, MinHash 签名) 列表，ID 重复时以最后写入的为准
+
+        返回：
+        - (原文字节数, 写入字节数)
+        """
+        self.close()
+        entries: Dict[int, Tuple[int, int, bytes]] = self._read_entries()
+        raw_bytes = stored_bytes = 0
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            for chunk_id, text, *rest in items:
+                signature = _SIGNATURE.pack(*rest[0]) if rest and rest[0] is not None else _NO_SIGNATURE
+                raw = text.encode("utf-8")
+                compressed = zlib.compress(raw, 9)
+                # 短文本压缩后可能更大，此时直接存原文
+                record = _COMPRESSED + compressed if len(compressed) < len(raw) else _RAW + raw
+                f.write(record)
+                entries[chunk_id] = (offset, len(record), signature)
+                offset += len(record)
+                raw_bytes += len(raw)
+                stored_bytes += len(record)
+
+        # 先写签名再替换索引：读取端以索引条数判断签名文件是否对齐
+        index_tmp, signatures_tmp = self.index_path + ".tmp", self.signatures_path + ".tmp"
+        with open(index_tmp, "wb") as index_file, open(signatures_tmp, "wb") as signatures_file:
+            for chunk_id in sorted(entries):
+                offset, length, signature = entries[chunk_id]
+                index_file.write(_RECORD.pack(chunk_id, offset, length))
+                signatures_file.write(signature)
+        os.replace(signatures_tmp, self.signatures_path)
+        os.replace(index_tmp, self.index_path)
+        return raw_bytes, stored_bytes
+
+    def _read_entries(self) -> Dict[int, Tuple[int, int, bytes]]:
+        """读取现有索引与签名；签名文件与索引不对齐（旧版本存储）时视为没有签名"""
+        with open(self.index_path, "rb") as f:
+            index = f.read()
+        with open(self.signatures_path, "rb") as f:
+            signatures = f.read()
+        count = len(index) // _RECORD.size
+        aligned = len(signatures) == count * _SIGNATURE.size
+        entries = {}
+        for i in range(count):
+            chunk_id, offset, length = _RECORD.unpack_from(index, i * _RECORD.size)
+            signature = signatures[i * _SIGNATURE.size:(i + 1) * _SIGNATURE.size] if aligned else _NO_SIGNATURE
+            entries[chunk_id] = (offset, length, signature)
+        return entries
+
+    # ----------------------------
+    # 读取
+    # ----------------------------
+    def _map(self) -> None:
+        """映射文件；其他进程（add_doc）追加过数据时重新映射"""
+        sizes = (
+            os.path.getsize(self.data_path),
+            os.path.getsize(self.index_path),
+            os.path.getsize(self.signatures_path),
+        )
+        if sizes == self._mapped_sizes:
+            return
+        self.close()
+        # 空文件无法 mmap
+        if sizes[0] and sizes[1]:
+            with open(self.data_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.index_path, "rb") as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if sizes[2] == sizes[1] // _RECORD.size * _SIGNATURE.size:
+                with open(self.signatures_path, "rb") as f:
+                    self._signatures = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_sizes = sizes
+
+    def _find(self, chunk_id: int) -> Optional[Tuple[int, int, int]]:
+        """在索引中二分查找 chunk ID，返回 (记录序号, 数据偏移, 数据长度)"""
+        lo, hi = 0, len(self._index) // _RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found_id, offset, length = _RECORD.unpack_from(self._index, mid * _RECORD.size)
+            if found_id == chunk_id:
+                return mid, offset, length
+            if found_id < chunk_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def get_many(self, chunk_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        批量读取片段原文
+
+        参数：
+        - chunk_ids: chunk ID 列表
+
+        返回：
+        - {chunk ID: 原文}，不存在的 ID 不出现在结果中
+        """
+        self._map()
+        texts: Dict[int, str] = {}
+        if self._index is None:
+            return texts
+        # 按 ID 排序读取，索引与数据的访问更连续
+        for chunk_id in sorted(set(chunk_ids)):
+            location = self._find(chunk_id)
+            if location is None:
+                continue
+            _, offset, length = location
+            record = self._data[offset:offset + length]
+            raw = zlib.decompress(record[1:]) if record[:1] == _COMPRESSED else record[1:]
+            texts[chunk_id] = raw.decode("utf-8")
+        return texts
+
+    def get_signatures(self, chunk_ids: Iterable[int]) -> Dict[int, Tuple[int, ...]]:
+        """
+        批量读取入库时存储的 MinHash 签名（不读取、不解压原文）
+
+        返回：
+        - {chunk ID: 签名}，不存在或没有签名的 ID 不出现在结果中
+        """
+        self._map()
+        signatures: Dict[int, Tuple[int, ...]] = {}
+        if self._signatures is None:
+            return signatures
+        for chunk_id in set(chunk_ids):
+            location = self._find(chunk_id)
+            if location is None:
+                continue
+            signature = _SIGNATURE.unpack_from(self._signatures, location[0] * _SIGNATURE.size)
+            if any(signature):
+                signatures[chunk_id] = signature
+        return signatures
+
+    def iter_signatures(self) -> Iterator[Tuple[int, ...]]:
+        """遍历全部已存储的签名（add_doc 初始化去重索引时使用）"""
+        self._map()
+        if self._signatures is None:
+            return
+        for offset in range(0, len(self._signatures), _SIGNATURE.size):
+            signature = _SIGNATURE.unpack_from(self._signatures, offset)
+            if any(signature):
+                yield signature
+
+    def close(self) -> None:
+        """释放映射"""
+        for mapped in (self._data, self._index, self._signatures):
+            if mapped is not None:
+                mapped.close()
+        self._data = self._index = self._signatures = None
+        self._mapped_sizes = (-1, -1, -1)
+
+
+def truncate_snippet(text: str, length: Optional[int]) -> str:
+    """截取片段前 length 个字符（None 表示不截取），结果长度不超过 length"""
+    if not length:
+        return text
+    return text[:length]
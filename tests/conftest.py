@@ -0,0 +1,28 @@
+# conftest.py
+# 测试路径配置：LangGraph 下的模块按脚本方式互相导入（如 from state import GraphState）
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "LangGraph"))
+
+
+@pytest.fixture
+def fake_server():
+    """启动本地假 LLM 接口，测试结束后关闭"""
+    from fake_llm_server import start_fake_server
+
+    servers = []
+
+    def start(**kwargs):
+        server, base_url = start_fake_server(**kwargs)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
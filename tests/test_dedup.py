@@ -0,0 +1,78 @@
+# test_dedup.py
+# 近重复去重：短模板文字、单字改动、不相关文本、检索结果折叠
+
+import random
+from types import SimpleNamespace
+
+from sripts.dedup import Deduplicator, collapse_hits, minhash
+
+POOL = "的是了我不人在他有这个上们来到时大地为子中你说生国着就那和要她出也得里后自以会家可下而过天去能对小多然于心学么之都好看起发当没成只如事把还用样道想作种开美总从无情己面最女但现前些所同日手又行意动方期它头经长儿回位爱老因很给名法间斯知世什使身者被高已亲其进此话常与活正感见明问力理尔点文定本公特做外孩相西果走将月实向声车全信重机工物气每并别真打太新比才便夫书部水像眼等体却加电主界门利海受听表德少克代员许先口由死安写性马光白或住难望教命花结乐色更拉东神记处让母父应直字场平报友关放至张认接告入笑内英军候民岁往何度山觉路带男边风解叫任金快原吃妈变通师立象数失满战远格士音轻目条呢病始达深完今提求清王化空业思切怎非找片罗钱吗语元喜曾离飞科言流欢约各即指合反题必该论交终林请医晚制球决传画保读运及则房早院量苦火布品近坐产答星精视连司巴奇管类未朋且婚台夜青北队久乎越观落尽形影红爸令周吧识步希亚术留市半热送兴造谈容极随演收首根讲整式取照办强石古华拿计您装似足双妻尼转诉米称丽客南领节衣站黑刻统断福城故历惊脸选包紧争另建维绝树系伤示愿持史谁准联妇纪基买志静阿诗独复痛消社算义竟确酒需单治卡幸兰念举仅钟怕共毛句息功官待究跟穿室易游程号居考突皮哪费倒价图具刚脑永歌响商礼细专黄块脚味灵改据般破引食仍存众注笔甚某沉血备习校默务土微娘须试怀料调广苏显赛查密议底列富梦错座参除跑亮假印设线温虽掉京初养香停际致阳纸李纳验助激够严证帝饭忘趣支春集丈木研班普导顿睡展跳获艺波察群皇段急庭创区奥器谢弟店否害草排背止组州朝封睛板角况曲馆育忙质河续哥呼若推境遇雨标姐充围案伦护冷警贝著雪索剧啊船险烟依斗值帮汉慢佛肯闻唱沙局伯族低玩资屋击速顾泪洲团圣旁堂兵露园牛哭旅街劳型烈姑陈莫鱼异抱宝权鲁简态级票怪寻杀律胜份汽右洋范床舞秘午登楼贵吸责例追较职属渐左录丝牙党继托赶章智冲叶胡吉卖坚喝肉遗救修松临藏担戏善卫药悲敢靠伊村戴词森耳差短祖云规窗散迷油旧适乡架恩投弹铁博雷府压超负勒杂醒洗采毫嘴毕冰既状乱景席珍童顶派素脱农疑练野按犯拍征坏骨余承置彩灯巨琴免环姆暗换技翻束增忍餐洛塞缺忆判欧层付阵玛批岛项狗休懂武革良恶恋委拥娜妙探呀营退摇弄桌熟诺宣银势奖宫忽套康供优课鸟喊降夏困刘罪亡鞋健模败伴守挥鲜财孤枪禁恐伙杰迹妹遍盖副坦牌江顺秋萨菜划授归浪"
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(POOL) for _ in range(length))
+
+
+def change_one_char(rng, text):
+    i = rng.randrange(len(text))
+    return text[:i] + rng.choice(POOL) + text[i + 1:]
+
+
+def test_short_boilerplate_differing_only_in_numbers_is_dropped():
+    dedup = Deduplicator()
+    assert dedup.check("作者的话：今天两更，求月票！")
+    assert not dedup.check("作者的话：今天三更，求月票！")
+    assert dedup.check("第一章")
+    assert not dedup.check("第二章")
+    assert dedup.report().startswith("去重丢弃 2 个")
+
+
+def test_different_chapter_titles_are_kept():
+    dedup = Deduplicator()
+    assert dedup.check("第十二章 废柴少年")
+    assert dedup.check("第三章 山门试炼")
+
+
+def test_single_char_edit_is_dropped_for_short_and_long_chunks():
+    rng = random.Random(1)
+    for length in (50, 200, 1000):
+        for _ in range(50):
+            text = random_text(rng, length)
+            dedup = Deduplicator()
+            assert dedup.check(text)
+            assert not dedup.check(change_one_char(rng, text)), length
+
+
+def test_unrelated_chunks_are_kept():
+    rng = random.Random(2)
+    dedup = Deduplicator()
+    texts = [random_text(rng, 50) for _ in range(200)]
+    assert all(dedup.check(text) for text in texts)
+    assert dedup.dropped == 0 and dedup.bytes_saved == 0
+
+
+def test_seeded_chunks_count_as_existing():
+    dedup = Deduplicator()
+    dedup.seed(minhash("林凡站在山门前，望着远处的云海，心中充满了不甘。"))
+    assert not dedup.check("林凡站在山门前，望着远处的云海，心中充满了不服。")
+
+
+def test_check_returns_signature_of_kept_chunk():
+    dedup = Deduplicator()
+    text = "林凡站在山门前，望着远处的云海。"
+    assert dedup.check(text) == minhash(text)
+    assert dedup.check(text) is None
+
+
+def test_collapse_hits_uses_stored_signatures_and_respects_limit():
+    hits = [SimpleNamespace(id=i, payload={}) for i in range(5)]
+    texts = {
+        0: "作者的话：今天两更，求月票！",
+        1: "作者的话：今天三更，求月票！",
+        2: "林凡站在山门前，望着远处的云海。",
+        3: "苏瑶在竹林中练剑，剑气纵横。",
+    }
+    signatures = {i: minhash(text) for i, text in texts.items()}
+    assert [h.id for h in collapse_hits(hits, signatures, limit=2)] == [0, 2]
+    # 没有签名的结果（旧数据）直接保留
+    assert [h.id for h in collapse_hits(hits, signatures, limit=5)] == [0, 2, 3, 4]
@@ -0,0 +1,63 @@
+# test_docstore.py
+# 片段原文存储：压缩读写、追加覆盖、跨实例读取、重置、片段截取
+
+from sripts.dedup import minhash
+from sripts.docstore import DocStore, truncate_snippet
+
+
+def test_put_and_get_many(tmp_path):
+    store = DocStore(str(tmp_path / "docstore"))
+    long_text = "林凡站在山门前，望着远处的云海。" * 20
+    raw_bytes, stored_bytes = store.put_many([(5, long_text), (1, "短"), (3, "abc")])
+
+    assert store.get_many([1, 3, 5, 9]) == {1: "短", 3: "abc", 5: long_text}
+    assert raw_bytes == sum(len(t.encode("utf-8")) for t in (long_text, "短", "abc"))
+    assert stored_bytes < raw_bytes  # 重复文本被压缩
+
+
+def test_append_overwrites_and_other_instances_see_updates(tmp_path):
+    path = str(tmp_path / "docstore")
+    reader = DocStore(path)
+    assert reader.get_many([1]) == {}  # 空存储
+
+    writer = DocStore(path)
+    writer.put_many([(1, "旧"), (2, "二")])
+    assert reader.get_many([1, 2]) == {1: "旧", 2: "二"}
+
+    writer.put_many([(1, "新"), (10 ** 12, "大 ID")])
+    assert reader.get_many([1, 2, 10 ** 12]) == {1: "新", 2: "二", 10 ** 12: "大 ID"}
+
+
+def test_signatures_are_stored_alongside_text(tmp_path):
+    path = str(tmp_path / "docstore")
+    store = DocStore(path)
+    store.put_many([(1, "第一段", minhash("第一段")), (2, "没有签名")])
+    store.put_many([(3, "第三段", minhash("第三段"))])  # 追加后旧签名仍与索引对齐
+
+    reader = DocStore(path)
+    assert reader.get_signatures([1, 2, 3, 9]) == {1: minhash("第一段"), 3: minhash("第三段")}
+    assert sorted(reader.iter_signatures()) == sorted([minhash("第一段"), minhash("第三段")])
+
+
+def test_store_without_signature_file_still_reads_text(tmp_path):
+    path = tmp_path / "docstore"
+    DocStore(str(path)).put_many([(1, "旧数据")])
+    (path / "signatures.bin").write_bytes(b"")  # 旧版本存储没有签名文件
+
+    store = DocStore(str(path))
+    assert store.get_many([1]) == {1: "旧数据"}
+    assert store.get_signatures([1]) == {}
+    store.put_many([(2, "新数据", minhash("新数据"))])
+    assert store.get_signatures([1, 2]) == {2: minhash("新数据")}
+
+
+def test_reset_clears_existing_text(tmp_path):
+    path = str(tmp_path / "docstore")
+    DocStore(path).put_many([(1, "旧")])
+    assert DocStore.reset(path).get_many([1]) == {}
+
+
+def test_truncate_snippet():
+    assert truncate_snippet("一二三四五", None) == "一二三四五"
+    assert truncate_snippet("一二三四五", 10) == "一二三四五"
+    assert truncate_snippet("一二三四五", 2) == "一二"
@@ -0,0 +1,75 @@
+# test_generate_to_length.py
+# 使用本地假接口测试按字数续写：达标即停、续写次数、次数上限、空续写、续写请求的上下文
+
+import os
+
+import pytest
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "fake")  # nodes 导入时创建共享网关
+
+import nodes
+from llm_gateway import LLMGateway
+
+MESSAGES = [{"role": "system", "content": "你是小说作者"}, {"role": "user", "content": "写大纲"}]
+
+
+@pytest.fixture
+def fake_llm(fake_server, monkeypatch):
+    """把 nodes.llm 指向按顺序回复的假接口"""
+    def start(replies):
+        server, base_url = fake_server(replies=replies)
+        monkeypatch.setattr(nodes, "llm", LLMGateway(model="fake", api_key="fake", base_url=base_url, backoff_base=0.01))
+        return server
+
+    return start
+
+
+def test_no_continuation_when_target_met(fake_llm):
+    server = fake_llm(["一二三四五六"])
+
+    text, continuations = nodes.generate_to_length(MESSAGES, min_length=5)
+
+    assert (text, continuations) == ("一二三四五六", 0)
+    assert server.requests == 1
+
+
+def test_continues_until_target_met(fake_llm):
+    server = fake_llm(["一二", "三四", "五六", "七八"])
+
+    text, continuations = nodes.generate_to_length(MESSAGES, min_length=5)
+
+    assert (text, continuations) == ("一二三四五六", 2)
+    assert server.requests == 3
+
+
+def test_stops_at_max_continuations(fake_llm, monkeypatch):
+    monkeypatch.setattr(nodes, "max_continuations", 2)
+    server = fake_llm(["一", "二", "三", "四"])
+
+    text, continuations = nodes.generate_to_length(MESSAGES, min_length=10)
+
+    assert (text, continuations) == ("一二三", 2)
+    assert server.requests == 3
+
+
+def test_empty_continuation_stops(fake_llm):
+    server = fake_llm(["一二", "", "三四"])
+
+    text, continuations = nodes.generate_to_length(MESSAGES, min_length=10)
+
+    assert (text, continuations) == ("一二", 1)
+    assert server.requests == 2
+
+
+def test_continuation_sends_existing_text_as_assistant_message(fake_llm):
+    server = fake_llm(["一二", "三四五"])
+
+    nodes.generate_to_length(MESSAGES, min_length=5, max_length=8)
+
+    continuation = server.bodies[1]["messages"]
+    assert continuation[:2] == MESSAGES
+    assert continuation[2] == {"role": "assistant", "content": "一二"}
+    assert continuation[3]["role"] == "user"
+    assert continuation[3]["content"].startswith(nodes.CONTINUE_PROMPT)
+    assert "还需约3字" in continuation[3]["content"]
+    assert "不要超过8字" in continuation[3]["content"]
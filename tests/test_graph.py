@@ -0,0 +1,56 @@
+# test_graph.py
+# 并行分支接线：读取节点与 LLM 节点替换为桩函数，检查分支都在汇合节点之前完成并记录耗时
+
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "fake")  # nodes 导入时创建共享网关
+
+import graph
+
+
+def test_branches_complete_before_each_join(monkeypatch):
+    calls = []
+    feedback = iter(["改一下", "y"])
+
+    def stub(name, update=None):
+        def node(state):
+            calls.append((name, dict(state.get("branch_timings") or {})))
+            return update(state) if update else {}
+        return node
+
+    monkeypatch.setattr(graph, "input_system_prompt", stub("input_system_prompt", lambda s: {"first_time": True}))
+    monkeypatch.setattr(graph, "load_outline_context", stub("load_outline_context", lambda s: {"outline_context": "旧大纲"}))
+    monkeypatch.setattr(graph, "load_worldguide_context", stub("load_worldguide_context", lambda s: {"worldguide_context": "旧设定"}))
+    monkeypatch.setattr(graph, "load_latest_outline", stub("load_latest_outline", lambda s: {"latest_outline": "新大纲"}))
+    monkeypatch.setattr(graph, "concat_prompt", stub("concat_prompt"))
+    monkeypatch.setattr(graph, "generate_outline", stub("generate_outline", lambda s: {"response": "大纲"}))
+    monkeypatch.setattr(graph, "outline_human_intervention",
+                        stub("outline_human_intervention", lambda s: {"user_input": next(feedback)}))
+    monkeypatch.setattr(graph, "concat_worldguide_prompt", stub("concat_worldguide_prompt"))
+    monkeypatch.setattr(graph, "generate_worldguide", stub("generate_worldguide", lambda s: {"response": "设定集"}))
+    monkeypatch.setattr(graph, "worldguide_human_intervention",
+                        stub("worldguide_human_intervention", lambda s: {"user_input": "quit"}))
+
+    app = graph.build_graph().compile()
+    result = app.invoke({"user_input": "", "first_time": True, "chapter_progress": 1})
+
+    names = [name for name, _ in calls]
+    assert names[0] == "input_system_prompt"
+    # 两个大纲分支在同一步并行执行，顺序不固定
+    assert sorted(names[1:3]) == ["load_outline_context", "load_worldguide_context"]
+    assert names[3:9] == [
+        "concat_prompt", "generate_outline", "outline_human_intervention",
+        "concat_prompt", "generate_outline", "outline_human_intervention",  # 反馈后重新生成，不再读取
+    ]
+    assert sorted(names[9:11]) == ["load_latest_outline", "load_worldguide_context"]
+    assert names[11:] == ["concat_worldguide_prompt", "generate_worldguide", "worldguide_human_intervention"]
+
+    # 汇合节点执行时，所属分支的耗时都已写入
+    joins = dict(calls[i] for i in (3, 11))
+    assert set(joins["concat_prompt"]) == {"read_outlines", "read_worldguides"}
+    assert {"read_latest_outline", "read_past_worldguides"} <= set(joins["concat_worldguide_prompt"])
+    assert set(result["branch_timings"]) == {
+        "read_outlines", "read_worldguides", "read_latest_outline", "read_past_worldguides",
+    }
+    assert result["outline_context"] == "旧大纲"
+    assert result["latest_outline"] == "新大纲"
@@ -0,0 +1,99 @@
+# test_llm_gateway.py
+# 使用本地假接口测试 LLMGateway：重试、优先级调度、调用记录、token 预留
+
+import threading
+import time
+
+import pytest
+
+from llm_gateway import BACKGROUND, INTERACTIVE, LLMCancelled, LLMGateway, _Scheduler
+
+
+def make_gateway(base_url, **kwargs):
+    return LLMGateway(model="fake", api_key="fake", base_url=base_url, backoff_base=0.01, **kwargs)
+
+
+def test_retries_rate_limit_and_records_attempts(fake_server):
+    server, base_url = fake_server(fail_first=1)
+    gateway = make_gateway(base_url)
+
+    response = gateway.invoke([{"role": "user", "content": "你好"}])
+
+    assert response.content == "[fake] 你好"
+    assert server.requests == 2
+    record = gateway.records[-1]
+    assert record.attempts == 2
+    assert record.ok
+
+
+def test_records_token_usage_and_latency(fake_server):
+    _, base_url = fake_server(latency=0.05, reply="回复内容")
+    gateway = make_gateway(base_url)
+
+    gateway.invoke([{"role": "user", "content": "你好世界"}], priority=BACKGROUND)
+
+    record = gateway.records[-1]
+    assert record.priority == BACKGROUND
+    assert record.input_tokens == 4
+    assert record.output_tokens == len("回复内容")
+    assert record.latency >= 0.05
+    assert record.queued >= 0
+    assert gateway.summary()["calls"] == 1
+
+
+def test_interactive_runs_before_background_when_saturated(fake_server):
+    _, base_url = fake_server(latency=0.5)
+    gateway = make_gateway(base_url, max_concurrency=1)
+
+    def call(priority):
+        return threading.Thread(target=gateway.invoke, args=([{"role": "user", "content": "x"}], priority))
+
+    blocker = call(5)
+    blocker.start()
+    time.sleep(0.2)  # 占住唯一的并发名额
+    background = call(BACKGROUND)
+    background.start()
+    time.sleep(0.1)
+    interactive = call(INTERACTIVE)
+    interactive.start()
+    for thread in (blocker, background, interactive):
+        thread.join()
+
+    assert [r.priority for r in gateway.records] == [5, INTERACTIVE, BACKGROUND]
+
+
+def test_cancelled_call_leaves_queue_without_request(fake_server):
+    server, base_url = fake_server(latency=0.3)
+    gateway = make_gateway(base_url, max_concurrency=1)
+    blocker = threading.Thread(target=gateway.invoke, args=([{"role": "user", "content": "x"}],))
+    blocker.start()
+    time.sleep(0.1)
+
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(LLMCancelled):
+        gateway.invoke([{"role": "user", "content": "y"}], priority=BACKGROUND, cancel=cancel)
+    blocker.join()
+
+    assert server.requests == 1
+
+
+def test_token_reservation_caps_concurrent_calls():
+    scheduler = _Scheduler(max_concurrency=2, tokens_per_minute=100)
+    first = scheduler.acquire(INTERACTIVE, tokens=60)
+
+    acquired = threading.Event()
+
+    def second():
+        reservation = scheduler.acquire(INTERACTIVE, tokens=60)
+        acquired.set()
+        scheduler.release(reservation, 60)
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    time.sleep(0.2)
+    assert not acquired.is_set()  # 预留 60 + 60 超出限额，即使并发名额空闲也要等待
+
+    scheduler.release(first, 30)  # 实际用量小于预留，修正后放行
+    assert acquired.wait(timeout=2)
+    thread.join()
@@ -0,0 +1,90 @@
+# test_speculative.py
+# 推测任务：输入变化时丢弃、生成失败时回退、排队中的后台请求在取出时被取消
+
+import threading
+import time
+
+import speculative
+from llm_gateway import BACKGROUND, LLMCancelled, LLMGateway
+
+MESSAGES = [{"role": "user", "content": "生成设定集"}]
+
+
+def test_take_returns_result_when_messages_match():
+    speculative.submit("match", MESSAGES, lambda messages, cancel: "推测结果")
+
+    assert speculative.take("match", [dict(m) for m in MESSAGES]) == "推测结果"
+    assert speculative.take("match", MESSAGES) is None  # 结果只能取出一次
+
+
+def test_take_discards_when_messages_changed():
+    cancels = []
+
+    def generate(messages, cancel):
+        cancels.append(cancel)
+        return "推测结果"
+
+    speculative.submit("changed", MESSAGES, generate)
+
+    assert speculative.take("changed", [{"role": "user", "content": "修改后的提示"}]) is None
+    assert cancels[0].is_set()
+
+
+def test_take_returns_none_when_generation_fails():
+    def generate(messages, cancel):
+        raise RuntimeError("接口错误")
+
+    speculative.submit("failed", MESSAGES, generate)
+
+    assert speculative.take("failed", MESSAGES) is None
+
+
+def test_take_cancels_task_not_yet_started():
+    def generate(messages, cancel):
+        # 模拟仍在排队：直到被取消才退出
+        assert cancel.wait(timeout=2)
+        raise LLMCancelled()
+
+    speculative.submit("queued", MESSAGES, generate)
+
+    started = time.time()
+    assert speculative.take("queued", MESSAGES) is None
+    assert time.time() - started < 1
+
+
+def test_discard_sets_cancel():
+    cancels = []
+    release = threading.Event()
+
+    def generate(messages, cancel):
+        cancels.append(cancel)
+        release.wait(timeout=2)
+        return "推测结果"
+
+    speculative.submit("discarded", MESSAGES, generate)
+    time.sleep(0.05)
+    speculative.discard("discarded")
+    release.set()
+
+    assert cancels[0].is_set()
+    assert speculative.take("discarded", MESSAGES) is None
+
+
+def test_queued_background_call_falls_back_to_interactive(fake_server):
+    server, base_url = fake_server(latency=0.5)
+    gateway = LLMGateway(model="fake", api_key="fake", base_url=base_url, max_concurrency=1, backoff_base=0.01)
+    blocker = threading.Thread(target=gateway.invoke, args=([{"role": "user", "content": "x"}],))
+    blocker.start()
+    time.sleep(0.1)  # 占住唯一的并发名额，后台请求只能排队
+
+    speculative.submit(
+        "gateway", MESSAGES,
+        lambda messages, cancel: gateway.invoke(messages, priority=BACKGROUND, cancel=cancel).content,
+    )
+    assert speculative.take("gateway", MESSAGES) is None
+
+    # 调用方改为前台生成：只发出阻塞请求与前台请求，后台请求没有发出
+    response = gateway.invoke(MESSAGES)
+    blocker.join()
+    assert response.content == "[fake] 生成设定集"
+    assert server.requests == 2